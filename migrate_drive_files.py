@@ -1,15 +1,29 @@
 import os
+import argparse
 import csv
-import io
+import email.utils
+import hashlib
+import json
+import logging
+import logging.handlers
 import shutil
+import sqlite3
+import sys
+import tempfile
 import time
+import queue
 import random
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import httplib2
 from google.oauth2.credentials import Credentials
+from requests.adapters import HTTPAdapter
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
-from google.auth.transport.requests import Request
+from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
+from google.auth.transport.requests import AuthorizedSession, Request
 
 # --- Configuration ---
 CREDENTIALS_FILE = 'credentials.json'
@@ -17,43 +31,350 @@ TOKEN_FILE = 'token.json'
 CSV_FILE = 'files_to_migrate.csv'  # Default CSV file name
 SOURCE_FOLDER_ID = 'your_source_folder_id'
 BACKUP_FOLDER_NAME = 'bak'
+BACKUP_FOLDER_ID_FILE = '.backup_id'  # Remembers the backup folder between runs
 SCOPES = [
     'https://www.googleapis.com/auth/drive',
     'https://www.googleapis.com/auth/drive.file',
     'https://www.googleapis.com/auth/drive.metadata'
 ]
+METADATA_CACHE_FILE = '_meta_cache.sqlite'
+METADATA_CACHE_TTL = 3600  # Seconds a cached files.get response stays fresh
+# Only lookups that don't ask for parents are cached: a file's parents can be
+# changed outside this script, and stale ones would make a move's
+# removeParents wrong. Names and MIME types can still go stale within the TTL
+# (or indefinitely in 'replay' mode).
+# 'enabled' reads and writes the cache, 'read-only' never writes to it,
+# 'replay' serves cached entries regardless of age, 'disabled' bypasses it.
+METADATA_CACHE_MODE = 'enabled'
+METADATA_CACHE_MODES = ('enabled', 'read-only', 'replay', 'disabled')
+PROCESSED_JOURNAL_FILE = 'processed.sqlite'  # Items already migrated, for resuming
+JOURNAL_COMMIT_EVERY = 50  # Journal inserts per commit
 MAX_RETRIES = 5
 INITIAL_BACKOFF = 1
+MAX_BACKOFF = 64  # Seconds
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# 403 reasons that mean "slow down" rather than "forbidden".
+RATE_LIMIT_REASONS = {'userRateLimitExceeded', 'rateLimitExceeded', 'quotaExceeded'}
+# Client-side rate limits, sized to Drive's per-user quotas
+# (about 10 writes/s, and 1000 reads per 100 s).
+WRITE_REQUESTS_PER_SECOND = 10
+WRITE_BURST = 10
+READ_REQUESTS_PER_SECOND = 10
+READ_BURST = 10
+LIST_PAGE_SIZE = 1000  # Largest page files.list allows
+PREFETCH_PARENTS_PER_QUERY = 50  # Folder IDs OR-ed into one files.list query
+BATCH_SIZE = 100  # Drive accepts at most 100 calls per batch request
+BATCH_WINDOW_SIZE = 20  # Single calls coalesced into one batch by BatchScheduler
+BATCH_MAX_WAIT = 0.05  # Seconds BatchScheduler holds a call waiting for company
+BATCH_FLUSH_THREADS = 4  # Batches BatchScheduler may have in flight at once
+SPOOL_MAX_SIZE = 64 * 1024 * 1024  # Downloads larger than this spill to disk
+MEDIA_CHUNK_SIZE = 8 * 1024 * 1024  # Download/resumable upload chunk (one retry unit)
+RESUMABLE_UPLOAD_THRESHOLD = 5 * 1024 * 1024  # Smaller files upload in a single request
+HTTP_TIMEOUT = 60  # Seconds
+HTTP_POOL_SIZE = 32  # Keep-alive connections shared by all threads
+MAX_WORKERS = 8  # Concurrent top-level CSV items
+MOVER_THREADS = 2  # Threads moving originals while workers keep copying
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
 
 # --- Helper Functions ---
 
+log = logging.getLogger('migrate')
+
+def start_logging(level):
+    """Routes the script's log records through a queue to a single writer thread.
+
+    Workers only enqueue records, so they never contend for the stdout lock.
+    Returns the QueueListener, which must be stopped to flush the output.
+    """
+    log_queue = queue.Queue(-1)
+    log.addHandler(logging.handlers.QueueHandler(log_queue))
+    log.setLevel(level)
+    log.propagate = False
+    # stdout, as the script's print() output always went there.
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    return listener
+
+# Extracts the file/folder ID from a Drive sharing URL.
+_ID_RE = re.compile(r"drive\.google\.com/(?:file/d|drive/folders)/([^/?#&]+)")
+
+def _drive_q_escape(value):
+    """Escapes a string for use inside single quotes in a Drive `q` query."""
+    return value.replace('\\', '\\\\').replace("'", "\\'")
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens/second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_update = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Takes `tokens` from the bucket, sleeping until they have been refilled."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_update) * self.rate)
+            self.last_update = now
+            # Reserve the tokens up front (possibly going into debt) so that
+            # concurrent callers queue behind each other instead of racing.
+            self.tokens -= tokens
+            wait_time = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+class MetadataCache:
+    """SQLite-backed cache of files.get responses, shared by all worker threads."""
+
+    def __init__(self, path, mode, ttl):
+        self.path = path
+        self.mode = mode
+        self.ttl = ttl
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        # Opened lazily so importing the module or running with the cache
+        # disabled never creates the database file.
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS files '
+                '(id TEXT PRIMARY KEY, file_id TEXT, json TEXT, fetched_at REAL)'
+            )
+            self.conn.execute('CREATE INDEX IF NOT EXISTS files_file_id ON files (file_id)')
+            self.conn.commit()
+        return self.conn
+
+    @staticmethod
+    def _key(file_id, fields):
+        return hashlib.sha256(f'{file_id}:{fields}'.encode('utf-8')).hexdigest()
+
+    def get(self, file_id, fields):
+        """Returns the cached metadata for file_id, or None on a miss or stale entry."""
+        if self.mode == 'disabled':
+            return None
+        with self.lock:
+            row = self._connect().execute(
+                'SELECT json, fetched_at FROM files WHERE id = ?', (self._key(file_id, fields),)
+            ).fetchone()
+        if row is None:
+            return None
+        if self.mode != 'replay' and time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, file_id, fields, metadata):
+        """Stores metadata for file_id (unless the cache is read-only or disabled)."""
+        if self.mode in ('read-only', 'disabled'):
+            return
+        with self.lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO files (id, file_id, json, fetched_at) VALUES (?, ?, ?, ?)',
+                (self._key(file_id, fields), file_id, json.dumps(metadata), time.time())
+            )
+            conn.commit()
+
+    def invalidate(self, file_id):
+        """Drops every cached entry for file_id, e.g. after it has been moved."""
+        if self.mode in ('read-only', 'disabled'):
+            return
+        with self.lock:
+            conn = self._connect()
+            conn.execute('DELETE FROM files WHERE file_id = ?', (file_id,))
+            conn.commit()
+
+class ProcessedJournal:
+    """SQLite journal of migrated items, so an interrupted run can be resumed.
+
+    Each source item gets a row as soon as its copy (or, for a folder, its
+    backup folder) exists, and is marked moved once the original has been
+    moved. A resumed run reuses recorded copies instead of making new ones,
+    and never treats a copy the script made as a new source.
+    """
+
+    def __init__(self, path, commit_every):
+        self.path = path
+        self.commit_every = commit_every
+        self.pending = 0
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS done '
+                '(id TEXT PRIMARY KEY, copied_id TEXT, ts REAL, moved INTEGER NOT NULL DEFAULT 0)'
+            )
+            self.conn.execute('CREATE INDEX IF NOT EXISTS done_copied_id ON done (copied_id)')
+            self.conn.commit()
+        return self.conn
+
+    def _write(self, sql, params, commit_now=False):
+        with self.lock:
+            conn = self._connect()
+            conn.execute(sql, params)
+            self.pending += 1
+            if commit_now or self.pending >= self.commit_every:
+                conn.commit()
+                self.pending = 0
+
+    def is_done(self, file_id):
+        """True if file_id was already moved, or is itself a copy made by the script."""
+        with self.lock:
+            row = self._connect().execute(
+                'SELECT 1 FROM done WHERE (id = ? AND moved = 1) OR copied_id = ? LIMIT 1',
+                (file_id, file_id)
+            ).fetchone()
+        return row is not None
+
+    def copy_of(self, file_id):
+        """Returns the ID of the copy (or backup folder) already made for file_id, or None."""
+        with self.lock:
+            row = self._connect().execute(
+                'SELECT copied_id FROM done WHERE id = ?', (file_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_copy(self, file_id, copied_id):
+        """Records the copy (or backup folder) made for file_id, before the original moves.
+
+        Committed straight away: losing this row would make a resumed run copy
+        the file again, whereas losing a moved row only repeats a move.
+        """
+        self._write(
+            'INSERT OR REPLACE INTO done (id, copied_id, ts, moved) VALUES (?, ?, ?, 0)',
+            (file_id, copied_id, time.time()),
+            commit_now=True
+        )
+
+    def record(self, file_id, copied_id):
+        """Marks file_id as moved; committed in batches of `commit_every` writes."""
+        self._write(
+            'INSERT OR REPLACE INTO done (id, copied_id, ts, moved) VALUES (?, ?, ?, 1)',
+            (file_id, copied_id, time.time())
+        )
+
+    def close(self):
+        """Commits any pending records and closes the database."""
+        with self.lock:
+            if self.conn is not None:
+                self.conn.commit()
+                self.conn.close()
+                self.conn = None
+                self.pending = 0
+
+processed_journal = ProcessedJournal(PROCESSED_JOURNAL_FILE, JOURNAL_COMMIT_EVERY)
+
+metadata_cache = MetadataCache(METADATA_CACHE_FILE, METADATA_CACHE_MODE, METADATA_CACHE_TTL)
+
+read_bucket = TokenBucket(READ_REQUESTS_PER_SECOND, READ_BURST)
+write_bucket = TokenBucket(WRITE_REQUESTS_PER_SECOND, WRITE_BURST)
+
+def _error_reasons(error):
+    """Returns the `reason` codes from an HttpError's JSON body."""
+    try:
+        body = json.loads(error.content.decode('utf-8'))
+        return {detail.get('reason') for detail in body['error'].get('errors', [])}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return set()
+
+def is_retryable_error(error):
+    """True for HttpErrors worth retrying: 429, 5xx, and rate-limit 403s."""
+    status = error.resp.status
+    if status in RETRYABLE_STATUSES:
+        return True
+    return status == 403 and bool(_error_reasons(error) & RATE_LIMIT_REASONS)
+
+def _retry_after(error):
+    """Returns the server's Retry-After delay in seconds, or None."""
+    value = error.resp.get('retry-after')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
 def retry_with_backoff(func):
-    """Decorator for retrying a function with exponential backoff."""
+    """Decorator for retrying a function with decorrelated-jitter backoff.
+
+    Retries network errors and retryable HttpErrors (see is_retryable_error),
+    honouring Retry-After when the server sends it. Other errors are raised.
+    """
     def wrapper(*args, **kwargs):
         retries = 0
-        backoff = INITIAL_BACKOFF
+        sleep = INITIAL_BACKOFF
         while retries < MAX_RETRIES:
             try:
                 return func(*args, **kwargs)
             except HttpError as error:
-                if error.resp.status in [429, 500, 502, 503, 504]:
-                    retries += 1
-                    wait_time = backoff * (2 ** retries) + random.uniform(0, 1)
-                    print(f"  Retrying in {wait_time:.2f} seconds (attempt {retries} of {MAX_RETRIES})...")
-                    time.sleep(wait_time)
-                else:
+                if not is_retryable_error(error):
                     raise
+                retries += 1
+                sleep = min(MAX_BACKOFF, random.uniform(INITIAL_BACKOFF, sleep * 3))
+                retry_after = _retry_after(error)
+                wait_time = retry_after if retry_after is not None else sleep
+                log.warning(f"  Retrying in {wait_time:.2f} seconds (attempt {retries} of {MAX_RETRIES})...")
+                time.sleep(wait_time)
             except (OSError, IOError) as error:
-                 retries += 1
-                 wait_time = backoff * (2**retries) + random.uniform(0,1)
-                 print(f" Network error. Retrying in {wait_time:.2f} seconds")
-                 time.sleep(wait_time)
+                retries += 1
+                sleep = min(MAX_BACKOFF, random.uniform(INITIAL_BACKOFF, sleep * 3))
+                log.warning(f" Network error. Retrying in {sleep:.2f} seconds")
+                time.sleep(sleep)
 
         raise Exception(f"Max retries ({MAX_RETRIES}) exceeded for {func.__name__}.")
     return wrapper
 
-def get_drive_service():
-    """Authenticates and returns a Google Drive API service object using OAuth 2.0."""
+@retry_with_backoff
+def _execute_batch_chunk(batch, size, bucket):
+    """Sends a single batch request with retries."""
+    # Every call inside a batch counts against the quota individually.
+    bucket.acquire(size)
+    batch.execute()
+
+def execute_batch(service, requests, bucket):
+    """Executes requests (a dict of request_id -> HttpRequest) through the batch endpoint.
+
+    `bucket` is the TokenBucket the requests are rate limited against.
+
+    Returns a (results, errors) tuple of dicts keyed by request_id. Media
+    downloads/uploads cannot be batched and must not be passed here.
+    """
+    results = {}
+    errors = {}
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            errors[request_id] = exception
+        else:
+            results[request_id] = response
+
+    items = list(requests.items())
+    for start in range(0, len(items), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=callback)
+        chunk = items[start:start + BATCH_SIZE]
+        for request_id, request in chunk:
+            batch.add(request, request_id=request_id)
+        _execute_batch_chunk(batch, len(chunk), bucket)
+    return results, errors
+
+_thread_local = threading.local()
+
+def get_credentials():
+    """Authenticates and returns OAuth 2.0 credentials for the Drive API."""
     creds = None
     if os.path.exists(TOKEN_FILE):
         creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
@@ -66,18 +387,200 @@ def get_drive_service():
             creds = flow.run_local_server(port=0)
         with open(TOKEN_FILE, 'w') as token:
             token.write(creds.to_json())
+    return creds
+
+def get_drive_service(creds):
+    """Returns the calling thread's Google Drive API service object.
 
-    service = build('drive', 'v3', credentials=creds)
+    Each thread builds its own service once and reuses it; all of them send
+    requests through the shared connection pool from get_http().
+    """
+    service = getattr(_thread_local, 'service', None)
+    if service is None:
+        service = build('drive', 'v3', http=get_http(creds), cache_discovery=False)
+        _thread_local.service = service
     return service
 
+class SessionHttp:
+    """httplib2.Http-compatible front end for a pooled AuthorizedSession.
+
+    googleapiclient only speaks the httplib2 interface, and httplib2.Http
+    objects can't be shared between threads. A requests Session can, so every
+    thread draws keep-alive connections from one pool instead of each holding
+    its own.
+    """
+
+    def __init__(self, creds, timeout, pool_size):
+        self.credentials = creds
+        self.timeout = timeout
+        self.session = AuthorizedSession(creds)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+
+    def request(self, uri, method='GET', body=None, headers=None, redirections=5, connection_type=None):
+        """Sends a request, returning (httplib2.Response, content) like httplib2.Http."""
+        response = self.session.request(method, uri, data=body, headers=headers, timeout=self.timeout)
+        content = response.content
+        info = {key.lower(): value for key, value in response.headers.items()}
+        # requests has already decoded any gzip body.
+        info.pop('content-encoding', None)
+        info['content-length'] = str(len(content))
+        info['status'] = str(response.status_code)
+        return httplib2.Response(info), content
+
+    def close(self):
+        # The session outlives any one service object; see get_http().
+        pass
+
+_shared_http = None
+_shared_http_lock = threading.Lock()
+
+def get_http(creds):
+    """Returns the process-wide authorized HTTP object, creating it on first use."""
+    global _shared_http
+    with _shared_http_lock:
+        if _shared_http is None:
+            _shared_http = SessionHttp(creds, HTTP_TIMEOUT, HTTP_POOL_SIZE)
+        return _shared_http
+
+class BatchScheduler:
+    """Coalesces single API calls made by many threads into batch requests.
+
+    A background thread collects queued calls into a window, closing it once
+    BATCH_WINDOW_SIZE are waiting or the oldest has waited BATCH_MAX_WAIT
+    seconds, and hands each window to a small pool of BATCH_FLUSH_THREADS
+    senders so a slow batch doesn't hold up the next one. Callers are rate
+    limited on their own thread before queueing. Until start() is called,
+    calls are executed directly on the caller's thread.
+    """
+
+    def __init__(self, window_size, max_wait, flush_threads):
+        self.window_size = window_size
+        self.max_wait = max_wait
+        self.flush_threads = flush_threads
+        self.queue = queue.Queue()
+        self.thread = None
+        self.flush_executor = None
+
+    def start(self, creds):
+        """Starts the background thread and the pool that sends the batches."""
+        self.flush_executor = ThreadPoolExecutor(max_workers=self.flush_threads)
+        self.thread = threading.Thread(target=self._run, args=(creds,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Sends any queued calls and stops the background threads."""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+            self.flush_executor.shutdown(wait=True)
+            self.flush_executor = None
+
+    def submit(self, request, bucket):
+        """Queues an HttpRequest, rate limited against bucket; returns a Future of its response."""
+        future = Future()
+        try:
+            bucket.acquire()
+            if self.thread is None:
+                future.set_result(request.execute())
+            else:
+                self.queue.put((request, future))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def execute(self, request, bucket):
+        """Like request.execute(), but sent as part of a batch when possible."""
+        return self.submit(request, bucket).result()
+
+    def _run(self, creds):
+        stopping = False
+        while not stopping:
+            job = self.queue.get()
+            if job is None:
+                return
+            jobs = [job]
+            deadline = time.monotonic() + self.max_wait
+            while len(jobs) < self.window_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    job = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                jobs.append(job)
+            try:
+                self.flush_executor.submit(self._flush, creds, jobs)
+            except Exception as e:
+                self._fail(jobs, e)
+
+    @staticmethod
+    def _fail(jobs, error):
+        for _, future in jobs:
+            if not future.done():
+                future.set_exception(error)
+
+    def _flush(self, creds, jobs):
+        # Every future must be resolved, whatever goes wrong, or its caller
+        # blocks forever in execute().
+        try:
+            service = get_drive_service(creds)
+            http = get_http(creds)
+
+            if len(jobs) == 1:
+                request, future = jobs[0]
+                future.set_result(request.execute(http=http))
+                return
+
+            futures = {str(i): future for i, (_, future) in enumerate(jobs)}
+
+            def callback(request_id, response, exception):
+                if exception is not None:
+                    futures[request_id].set_exception(exception)
+                else:
+                    futures[request_id].set_result(response)
+
+            batch = service.new_batch_http_request(callback=callback)
+            for request_id, (request, _) in enumerate(jobs):
+                batch.add(request, request_id=str(request_id))
+            batch.execute(http=http)
+        except Exception as e:
+            self._fail(jobs, e)
+        finally:
+            self._fail(jobs, Exception("Batch response did not include this request."))
+
+batch_scheduler = BatchScheduler(BATCH_WINDOW_SIZE, BATCH_MAX_WAIT, BATCH_FLUSH_THREADS)
+
 @retry_with_backoff
-def get_file_metadata(service, file_id, fields='name, id, mimeType, owners, parents'):
-    """Retrieves metadata for a file."""
+def get_file_metadata(service, file_id, fields='id, name, mimeType, parents'):
+    """Retrieves metadata for a file, consulting the metadata cache first.
+
+    Lookups that ask for parents bypass the cache: parents become the
+    removeParents of a move, and the file may have been moved since it was
+    cached.
+    """
+    cacheable = 'parents' not in fields
+    if cacheable:
+        file = metadata_cache.get(file_id, fields)
+        if file is not None:
+            return file
     try:
-        file = service.files().get(fileId=file_id, fields=fields, supportsAllDrives=True).execute()
+        file = batch_scheduler.execute(
+            service.files().get(fileId=file_id, fields=fields, supportsAllDrives=True),
+            read_bucket
+        )
+        if cacheable:
+            metadata_cache.put(file_id, fields, file)
         return file
     except HttpError as error:
-        print(f'An error occurred: {error}')
+        if is_retryable_error(error):
+            raise
+        log.error(f'An error occurred: {error}')
         return None
 
 @retry_with_backoff
@@ -85,69 +588,77 @@ def create_folder(service, folder_name, parent_id=None):
     """Creates a folder in Google Drive."""
     file_metadata = {
         'name': folder_name,
-        'mimeType': 'application/vnd.google-apps.folder'
+        'mimeType': FOLDER_MIME_TYPE
     }
     if parent_id:
         file_metadata['parents'] = [parent_id]
 
     try:
-        folder = service.files().create(body=file_metadata, fields='id', supportsAllDrives=True).execute()
-        print(f'Folder created: {folder_name} ({folder.get("id")})')
+        folder = batch_scheduler.execute(
+            service.files().create(body=file_metadata, fields='id', supportsAllDrives=True),
+            write_bucket
+        )
+        log.info(f'Folder created: {folder_name} ({folder.get("id")})')
         return folder.get('id')
     except HttpError as error:
-        print(f'An error occurred: {error}')
+        if is_retryable_error(error):
+            raise
+        log.error(f'An error occurred: {error}')
         return None
 
 @retry_with_backoff
-def copy_file(service, file_id, new_file_name=None):
-    """Copies a file."""
-    try:
-        original_file = get_file_metadata(service, file_id)
-        if not original_file:
-            print(f"  Could not retrieve metadata for file ID: {file_id}")
-            return None
+def copy_file(service, file_id, new_file_name, fields='id'):
+    """Copies a file, naming the copy new_file_name.
 
-        file_metadata = {
-            'name': new_file_name or original_file['name'],
-        }
-
-        copied_file = service.files().copy(
-            fileId=file_id,
-            body=file_metadata,
-            fields='id, name, parents',
-            supportsAllDrives=True
-        ).execute()
+    Returns the copy's ID; ask for more fields only if the caller needs them.
+    """
+    try:
+        copied_file = batch_scheduler.execute(
+            service.files().copy(
+                fileId=file_id,
+                body={'name': new_file_name},
+                fields=fields,
+                supportsAllDrives=True
+            ),
+            write_bucket
+        )
 
-        print(f'  File copied: {original_file["name"]} -> {copied_file.get("name")} ({copied_file.get("id")})')
+        log.info(f'  File copied: {new_file_name} ({copied_file.get("id")})')
         return copied_file.get('id')
 
     except HttpError as error:
-        print(f'  An error occurred while copying {file_id}: {error}')
+        if is_retryable_error(error):
+            raise
+        log.error(f'  An error occurred while copying {file_id}: {error}')
         return None
 
 @retry_with_backoff
-def move_file(service, file_id, new_parent_id):
-    """Moves a file to a new folder."""
+def move_file(service, file_id, new_parent_id, previous_parents):
+    """Moves a file from previous_parents (a list of folder IDs) to a new folder."""
     try:
-        file = service.files().get(fileId=file_id, fields='parents', supportsAllDrives=True).execute()
-        previous_parents = ",".join(file.get('parents'))
-        file = service.files().update(fileId=file_id,
-                                      addParents=new_parent_id,
-                                      removeParents=previous_parents,
-                                      fields='id, parents',
-                                      supportsAllDrives=True).execute()
-        print(f'  File moved: {file_id} to {new_parent_id}')
+        file = batch_scheduler.execute(
+            service.files().update(fileId=file_id,
+                                   addParents=new_parent_id,
+                                   removeParents=",".join(previous_parents),
+                                   fields='id',
+                                   supportsAllDrives=True),
+            write_bucket
+        )
+        metadata_cache.invalidate(file_id)
+        log.info(f'  File moved: {file_id} to {new_parent_id}')
         return file.get('id')
     except HttpError as error:
-        print(f'  An error occurred: {error}')
+        if is_retryable_error(error):
+            raise
+        log.error(f'  An error occurred: {error}')
         return None
 
 @retry_with_backoff
 def download_and_upload_file(service, file_id, original_filename):
     """Downloads/re-uploads a file (used as fallback)."""
-    original_file = get_file_metadata(service, file_id)
+    original_file = get_file_metadata(service, file_id, fields='id, name, mimeType')
     if not original_file:
-        print(f"  Could not retrieve metadata for file ID: {file_id}")
+        log.warning(f"  Could not retrieve metadata for file ID: {file_id}")
         return None
 
     mime_type = original_file.get('mimeType')
@@ -170,13 +681,17 @@ def download_and_upload_file(service, file_id, original_filename):
         else:
             request = service.files().get_media(fileId=file_id)
 
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
+        fh = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        downloader = MediaIoBaseDownload(fh, request, chunksize=MEDIA_CHUNK_SIZE)
         done = False
         while done is False:
+            read_bucket.acquire()
             status, done = downloader.next_chunk()
-            print(f"  Download {int(status.progress() * 100)}%.")
+            log.info(f"  Download {int(status.progress() * 100)}%.")
 
+        # A resumable upload costs an extra round trip to open the session,
+        # which is only worth it for larger files.
+        resumable = fh.tell() >= RESUMABLE_UPLOAD_THRESHOLD
         fh.seek(0)
 
         new_file_name = os.path.splitext(original_filename)[0] + file_extension
@@ -185,16 +700,19 @@ def download_and_upload_file(service, file_id, original_filename):
         }
 
         if export_mime:
-             media = MediaIoBaseUpload(fh, mimetype=export_mime, resumable=True)
+             media = MediaIoBaseUpload(fh, mimetype=export_mime, chunksize=MEDIA_CHUNK_SIZE, resumable=resumable)
         else:
-             media = MediaIoBaseUpload(fh, mimetype=mime_type, resumable=True)
+             media = MediaIoBaseUpload(fh, mimetype=mime_type, chunksize=MEDIA_CHUNK_SIZE, resumable=resumable)
 
+        write_bucket.acquire()
         new_file = service.files().create(body=file_metadata, media_body=media, fields='id', supportsAllDrives=True).execute()
-        print(f'  File downloaded and re-uploaded: {new_file_name} ({new_file.get("id")})')
+        log.info(f'  File downloaded and re-uploaded: {new_file_name} ({new_file.get("id")})')
         return new_file.get('id')
 
     except HttpError as error:
-        print(f'  An error occurred: {error}')
+        if is_retryable_error(error):
+            raise
+        log.error(f'  An error occurred: {error}')
         return None
 
     finally:
@@ -202,116 +720,443 @@ def download_and_upload_file(service, file_id, original_filename):
            fh.close()
 
 @retry_with_backoff
-def list_files_in_folder(service, folder_id):
-    """Lists files in a folder with retries, handling pagination."""
+def list_files_in_folders(service, folder_ids, page_token=None):
+    """Lists one page of the children of any of folder_ids, with retries.
+
+    Pass the response's nextPageToken back in as page_token for the next page.
+    """
+    parents_query = " or ".join(f"'{_drive_q_escape(folder_id)}' in parents" for folder_id in folder_ids)
+    read_bucket.acquire()
     results = service.files().list(
-        q=f"'{folder_id}' in parents and trashed = false",
-        fields="nextPageToken, files(id, name, mimeType, owners)",
+        q=f"({parents_query}) and trashed = false",
+        fields="nextPageToken, files(id, name, mimeType, parents)",
+        orderBy='folder,name',
+        pageSize=LIST_PAGE_SIZE,
+        pageToken=page_token,
         supportsAllDrives=True
     ).execute()
     return results
-def process_item(service, file_id, backup_folder_id):
-    """Processes a single file or folder (recursively)."""
-    file_metadata = get_file_metadata(service, file_id)
-    if not file_metadata:
-        print(f"  Skipping - Could not retrieve metadata for file ID: {file_id}")
+
+def prefetch_subtree(service, root_ids):
+    """Lists every descendant of the root_ids folders.
+
+    Drive has no recursive query, so the tree is walked one level at a time,
+    OR-ing a whole level's folder IDs into each files.list query. This costs
+    O(depth) paginated list calls rather than one per folder.
+    Returns a dict mapping each folder ID to a list of its children's metadata.
+    """
+    children = {root_id: [] for root_id in root_ids}
+    level = list(root_ids)
+    while level:
+        next_level = []
+        for start in range(0, len(level), PREFETCH_PARENTS_PER_QUERY):
+            parent_ids = level[start:start + PREFETCH_PARENTS_PER_QUERY]
+            page_token = None
+            while True:
+                results = list_files_in_folders(service, parent_ids, page_token)
+                for item in results.get('files', []):
+                    for parent_id in item.get('parents', []):
+                        if parent_id in parent_ids:
+                            children[parent_id].append(item)
+                    if item['mimeType'] == FOLDER_MIME_TYPE and item['id'] not in children:
+                        children[item['id']] = []
+                        next_level.append(item['id'])
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+        level = next_level
+    return children
+
+def copy_file_with_fallback(service, file_id, file_name):
+    """Copies a file, falling back to download/re-upload if the copy fails."""
+    copied_file_id = copy_file(service, file_id, file_name)
+    if not copied_file_id:
+        log.warning(f"    Copy failed, attempting download/upload...")
+        copied_file_id = download_and_upload_file(service, file_id, file_name)
+    return copied_file_id
+
+def move_and_record(service, file_id, copied_file_id, new_parent_id, previous_parents):
+    """Moves a migrated item and records it in the processed journal."""
+    if move_file(service, file_id, new_parent_id, previous_parents):
+        processed_journal.record(file_id, copied_file_id)
+
+def process_files_batch(service, files, parent_id, backup_folder_id):
+    """Copies and moves the (non-folder) children of a folder using batch requests."""
+    files = [item for item in files if not processed_journal.is_done(item['id'])]
+    if not files:
         return
 
-    if file_metadata['mimeType'] == 'application/vnd.google-apps.folder':
-        print(f"  Processing folder: {file_metadata['name']} ({file_id})")
-        new_folder_id = create_folder(service, file_metadata['name'], parent_id=backup_folder_id)
-        if not new_folder_id:
-            print(f"    Error creating subfolder in backup folder.")
-            return
+    to_move = {}  # source ID -> copy ID
+    to_copy = []
+    for item in files:
+        copied_file_id = processed_journal.copy_of(item['id'])
+        if copied_file_id:
+            log.info(f"  Already copied: {item['name']} ({copied_file_id})")
+            to_move[item['id']] = copied_file_id
+        else:
+            to_copy.append(item)
+
+    copy_requests = {
+        item['id']: service.files().copy(
+            fileId=item['id'],
+            body={'name': item['name']},
+            fields='id',
+            supportsAllDrives=True
+        )
+        for item in to_copy
+    }
+    copied, copy_errors = execute_batch(service, copy_requests, write_bucket)
+
+    for item in to_copy:
+        log.info(f"  Processing file: {item['name']} ({item['id']})")
+        if item['id'] in copied:
+            copied_file = copied[item['id']]
+            log.info(f'  File copied: {item["name"]} ({copied_file.get("id")})')
+            to_move[item['id']] = copied_file.get('id')
+            processed_journal.record_copy(item['id'], copied_file.get('id'))
+            continue
 
+        error = copy_errors.get(item['id'])
+        if isinstance(error, HttpError) and error.resp.status == 404:
+            log.error(f"    Failed to copy file ID: {item['id']}: {error}")
+            continue
         try:
-            results = list_files_in_folder(service, file_id) #now uses retry
-            items = results.get('files', [])
-
-            #handle pagination
-            while 'nextPageToken' in results:
-                results = list_files_in_folder(service, file_id, results['nextPageToken'])
-                items.extend(results.get('files',[]))
-        except HttpError as error:
-                print(f"    An error occurred listing folder contents: {error}")
+            if isinstance(error, HttpError) and not is_retryable_error(error):
+                log.warning(f"    Batched copy failed ({error}), attempting download/upload...")
+                copied_file_id = download_and_upload_file(service, item['id'], item['name'])
+            else:
+                log.warning(f"    Batched copy failed ({error}), retrying individually...")
+                copied_file_id = copy_file_with_fallback(service, item['id'], item['name'])
+        except Exception as e:
+            # Keep going so the copies already made still get moved and journaled.
+            log.error(f"    Failed to copy file ID: {item['id']}: {e}")
+            continue
+        if copied_file_id:
+            to_move[item['id']] = copied_file_id
+            processed_journal.record_copy(item['id'], copied_file_id)
+        else:
+            log.error(f"    Failed to copy file ID: {item['id']}")
+
+    move_requests = {
+        source_id: service.files().update(
+            fileId=source_id,
+            addParents=backup_folder_id,
+            removeParents=parent_id,
+            fields='id',
+            supportsAllDrives=True
+        )
+        for source_id in to_move
+    }
+    moved, move_errors = execute_batch(service, move_requests, write_bucket)
+
+    for source_id, copied_file_id in to_move.items():
+        if source_id in moved:
+            metadata_cache.invalidate(source_id)
+            processed_journal.record(source_id, copied_file_id)
+            log.info(f'  File moved: {source_id} to {backup_folder_id}')
+        else:
+            error = move_errors.get(source_id)
+            if isinstance(error, HttpError) and not is_retryable_error(error):
+                log.error(f"    Failed to move file ID: {source_id}: {error}")
+                continue
+            log.warning(f"    Batched move failed ({error}), retrying individually...")
+            try:
+                move_and_record(service, source_id, copied_file_id, backup_folder_id, [parent_id])
+            except Exception as e:
+                log.error(f"    Failed to move file ID: {source_id}: {e}")
+
+class MovePipeline:
+    """Moves copied originals on background threads.
+
+    A worker hands the move off as soon as its copy returns and goes on to
+    the next copy, so each move's round trip overlaps with later copies.
+    """
+
+    def __init__(self, creds, num_threads=MOVER_THREADS):
+        self.queue = queue.Queue()
+        self.threads = [
+            threading.Thread(target=self._run, args=(creds,), daemon=True)
+            for _ in range(num_threads)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, file_id, copied_file_id, new_parent_id, previous_parents):
+        """Queues a move_and_record() call."""
+        self.queue.put((file_id, copied_file_id, new_parent_id, previous_parents))
+
+    def _run(self, creds):
+        service = get_drive_service(creds)
+        while True:
+            job = self.queue.get()
+            if job is None:
                 return
+            try:
+                move_and_record(service, *job)
+            except Exception as e:
+                log.error(f"An unexpected error occurred moving {job[0]}: {e}")
+
+    def close(self):
+        """Waits for every queued move to finish and stops the threads."""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            # The copies are already made, so their moves must finish (and be
+            # journaled) before the journal is closed, even on Ctrl-C.
+            while thread.is_alive():
+                try:
+                    thread.join()
+                except KeyboardInterrupt:
+                    log.warning("Interrupted, waiting for queued moves to finish...")
 
-        for item in items:
-            process_item(service, item['id'], new_folder_id)
+def process_item(service, file_id, backup_folder_id, tree=None, mover=None, file_metadata=None):
+    """Processes a single file or folder (recursively).
+
+    tree is the prefetch_subtree() result for an enclosing folder; when it is
+    None the folder's subtree is fetched here. If a MovePipeline is given as
+    mover, a copied file's move is queued on it instead of run inline.
+    file_metadata (id, name, mimeType, parents) is fetched only if not given.
+    """
+    if processed_journal.is_done(file_id):
+        log.info(f"  Skipping - Already processed: {file_id}")
+        return
+
+    if file_metadata is None:
+        file_metadata = get_file_metadata(service, file_id)
+    if not file_metadata:
+        log.warning(f"  Skipping - Could not retrieve metadata for file ID: {file_id}")
+        return
+
+    if file_metadata['mimeType'] == FOLDER_MIME_TYPE:
+        log.info(f"  Processing folder: {file_metadata['name']} ({file_id})")
+        new_folder_id = processed_journal.copy_of(file_id)
+        if new_folder_id:
+            log.info(f"    Reusing backup subfolder from an earlier run: {new_folder_id}")
+        else:
+            new_folder_id = create_folder(service, file_metadata['name'], parent_id=backup_folder_id)
+            if not new_folder_id:
+                log.error(f"    Error creating subfolder in backup folder.")
+                return
+            processed_journal.record_copy(file_id, new_folder_id)
+
+        if tree is None:
+            try:
+                tree = prefetch_subtree(service, [file_id])
+            except HttpError as error:
+                log.error(f"    An error occurred listing folder contents: {error}")
+                return
+        items = tree.get(file_id, [])
 
-        move_file(service, file_id, backup_folder_id)
+        folders = [item for item in items if item['mimeType'] == FOLDER_MIME_TYPE]
+        files = [item for item in items if item['mimeType'] != FOLDER_MIME_TYPE]
+
+        for item in folders:
+            process_item(service, item['id'], new_folder_id, tree, mover, file_metadata=item)
+
+        # Plain files need no recursion, so their copies and moves are batched.
+        process_files_batch(service, files, file_id, new_folder_id)
+
+        move_and_record(service, file_id, new_folder_id, backup_folder_id, file_metadata.get('parents', []))
 
     else:
-        print(f"  Processing file: {file_metadata['name']} ({file_id})")
-        copied_file_id = copy_file(service, file_id)
-        if not copied_file_id:
-            print(f"    Copy failed, attempting download/upload...")
-            file_name = file_metadata['name']
-            copied_file_id = download_and_upload_file(service, file_id, file_name)
-
-        if not copied_file_id:
-            print(f"    Failed to copy file ID: {file_id}")
-            return
+        log.info(f"  Processing file: {file_metadata['name']} ({file_id})")
+        copied_file_id = processed_journal.copy_of(file_id)
+        if copied_file_id:
+            log.info(f"  Already copied: {file_metadata['name']} ({copied_file_id})")
+        else:
+            copied_file_id = copy_file_with_fallback(service, file_id, file_metadata['name'])
+            if not copied_file_id:
+                log.error(f"    Failed to copy file ID: {file_id}")
+                return
+            processed_journal.record_copy(file_id, copied_file_id)
 
-        move_file(service, file_id, backup_folder_id)
+        if mover:
+            mover.submit(file_id, copied_file_id, backup_folder_id, file_metadata.get('parents', []))
+        else:
+            move_and_record(service, file_id, copied_file_id, backup_folder_id, file_metadata.get('parents', []))
+
+def process_item_worker(creds, file_id, backup_folder_id, mover):
+    """Runs process_item on a worker thread with that thread's own service."""
+    process_item(get_drive_service(creds), file_id, backup_folder_id, mover=mover)
+
+def _url_column(fieldnames):
+    """Returns the CSV column holding the Drive URLs.
+
+    Prefers a column headed 'URL' or 'Link', falling back to the second column.
+    """
+    if not fieldnames:
+        return None
+    for name in fieldnames:
+        if name and name.strip().lower() in ('url', 'link'):
+            return name
+    return fieldnames[1] if len(fieldnames) > 1 else None
 
-def process_csv(service, csv_file, backup_folder_id):
-    """Processes the CSV."""
+def _shutdown_workers(executor, cancel_pending):
+    """Shuts the worker pool down, waiting for running items even through repeated Ctrl-C.
+
+    With cancel_pending, items still queued are dropped; a Ctrl-C while
+    waiting also drops them.
+    """
+    executor.shutdown(wait=False, cancel_futures=cancel_pending)
+    while True:
+        try:
+            executor.shutdown(wait=True)
+            return
+        except KeyboardInterrupt:
+            log.warning("Interrupted, waiting for in-flight items to finish...")
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def process_csv(creds, csv_file, backup_folder_id):
+    """Processes the CSV, handling each listed item on a worker thread."""
+    mover = MovePipeline(creds)
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
     try:
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader, None)
+        with open(csv_file, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.DictReader(file)
+            url_column = _url_column(reader.fieldnames)
+            if url_column is None:
+                log.error(f"Error: Could not find a URL column in {csv_file}")
+                return
 
-            for row in reader:
-                if not row or len(row) <= 1:
+            futures = {}
+            while True:
+                # Malformed rows (NUL bytes, oversized fields) raise csv.Error
+                # from the reader itself; skip them and keep going.
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    break
+                except csv.Error as e:
+                    log.warning(f"Skipping malformed row {reader.line_num}: {e}")
                     continue
 
-                url = row[1].strip()
-                file_id = None
-                if "drive.google.com/file/d/" in url:
-                    file_id = url.split("drive.google.com/file/d/")[1].split("/")[0]
-                elif "drive.google.com/drive/folders/" in url:
-                    file_id = url.split("drive.google.com/drive/folders/")[1].split("?")[0]
+                url = (row.get(url_column) or '').strip()
+                if not url:
+                    continue
+
+                match = _ID_RE.search(url)
+                file_id = match.group(1) if match else None
 
                 if not file_id:
-                    print(f"Skipping row - Could not extract File ID from URL: {url}")
+                    log.warning(f"Skipping row - Could not extract File ID from URL: {url}")
                     continue
 
-                print(f"Processing file ID: {file_id}, URL: {url}")
-                process_item(service, file_id, backup_folder_id)
+                log.info(f"Processing file ID: {file_id}, URL: {url}")
+                future = executor.submit(process_item_worker, creds, file_id, backup_folder_id, mover)
+                futures[future] = file_id
+
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    log.error(f"An unexpected error occurred processing {futures[future]}: {e}")
 
     except FileNotFoundError:
-        print(f"Error: CSV file not found at {csv_file}")
+        log.error(f"Error: CSV file not found at {csv_file}")
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        log.error(f"An unexpected error occurred: {e}")
+    except BaseException:
+        # Ctrl-C: let in-flight items finish but start no new ones, so the
+        # journal and scheduler are only torn down once the workers are idle.
+        log.warning("Interrupted, waiting for in-flight items to finish...")
+        _shutdown_workers(executor, cancel_pending=True)
+        raise
+    finally:
+        _shutdown_workers(executor, cancel_pending=False)
+        mover.close()
+
+@retry_with_backoff
+def _backup_folder_usable(service, folder_id):
+    """Checks with a single files.get that a remembered backup folder is still accessible.
+
+    A folder that is gone, trashed, or not visible to this account (404/403)
+    is unusable; rate limits and server errors are retried.
+    """
+    try:
+        read_bucket.acquire()
+        folder = service.files().get(fileId=folder_id, fields='id, trashed', supportsAllDrives=True).execute()
+    except HttpError as error:
+        if is_retryable_error(error):
+            raise
+        if error.resp.status in (403, 404):
+            log.warning(f"Backup folder {folder_id} is not accessible: {error}")
+            return False
+        raise
+    return not folder.get('trashed')
+
+def find_or_create_backup_folder(service):
+    """Returns the backup folder's ID, creating the folder in My Drive if needed.
+
+    The ID is remembered in BACKUP_FOLDER_ID_FILE so later runs skip the search.
+    """
+    if os.path.exists(BACKUP_FOLDER_ID_FILE):
+        with open(BACKUP_FOLDER_ID_FILE, 'r', encoding='utf-8') as f:
+            backup_folder_id = f.read().strip()
+        if backup_folder_id and _backup_folder_usable(service, backup_folder_id):
+            log.info(f"Using backup folder ID from {BACKUP_FOLDER_ID_FILE}: {backup_folder_id}")
+            return backup_folder_id
+        log.warning(f"Backup folder ID in {BACKUP_FOLDER_ID_FILE} is no longer usable, searching again.")
+
+    q = (f"mimeType = '{FOLDER_MIME_TYPE}' and name = '{_drive_q_escape(BACKUP_FOLDER_NAME)}'"
+         " and 'root' in parents and trashed = false")
+    read_bucket.acquire()
+    response = service.files().list(q=q, fields='files(id)', supportsAllDrives=True).execute()
+    folders = response.get('files', [])
+
+    if folders:
+        backup_folder_id = folders[0]['id']
+        log.info(f"Backup folder '{BACKUP_FOLDER_NAME}' already exists with ID: {backup_folder_id}")
+    else:
+        backup_folder_id = create_folder(service, BACKUP_FOLDER_NAME)
+        if not backup_folder_id:
+            return None
+
+    with open(BACKUP_FOLDER_ID_FILE, 'w', encoding='utf-8') as f:
+        f.write(backup_folder_id)
+    return backup_folder_id
 
 def main():
     """Main function."""
-    service = get_drive_service()
+    parser = argparse.ArgumentParser(
+        description='Copies Drive files you do not own and moves the originals to a backup folder.')
+    parser.add_argument('--cache-mode', choices=METADATA_CACHE_MODES, default=METADATA_CACHE_MODE,
+                        help=f'How the metadata cache in {METADATA_CACHE_FILE} is used.')
+    parser.add_argument('--log-level', default='INFO',
+                        choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'),
+                        help='Minimum level of messages to print.')
+    args = parser.parse_args()
+    metadata_cache.mode = args.cache_mode
+
+    listener = start_logging(args.log_level)
+    try:
+        migrate()
+    finally:
+        listener.stop()
+
+def migrate():
+    """Finds the backup folder and processes the CSV."""
+    creds = get_credentials()
+    service = get_drive_service(creds)
     if not service:
-        print("Failed to initialize Drive service.")
+        log.error("Failed to initialize Drive service.")
         return
 
-    backup_folder_id = None
     try:
-        q = f"mimeType = 'application/vnd.google-apps.folder' and name = '{BACKUP_FOLDER_NAME}' and 'root' in parents and trashed = false"
-        response = service.files().list(q=q, fields='files(id, name)',supportsAllDrives = True).execute()
-        folders = response.get('files', [])
-
-        if folders:
-            backup_folder_id = folders[0]['id']
-            print(f"Backup folder '{BACKUP_FOLDER_NAME}' already exists with ID: {backup_folder_id}")
-        else:
-            backup_folder_id = create_folder(service, BACKUP_FOLDER_NAME)
-            if not backup_folder_id:
-                print("Error: Could not create backup folder.")
-                return
+        backup_folder_id = find_or_create_backup_folder(service)
     except HttpError as error:
-        print(f"Error checking/creating backup folder: {error}")
+        log.error(f"Error checking/creating backup folder: {error}")
+        return
+    if not backup_folder_id:
+        log.error("Error: Could not create backup folder.")
         return
 
-    process_csv(service, CSV_FILE, backup_folder_id)
-    print("Script finished.")
+    batch_scheduler.start(creds)
+    try:
+        process_csv(creds, CSV_FILE, backup_folder_id)
+    finally:
+        batch_scheduler.stop()
+        processed_journal.close()
+    log.info("Script finished.")
 
 if __name__ == '__main__':
      main()